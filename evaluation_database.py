@@ -9,18 +9,109 @@ import toml
 import pandas as pd
 import sqlite3
 from datetime import datetime, timedelta
-from langsmith import Client
 import time
 import json
-from typing import Optional, Dict, List, Any
+from collections import Counter, namedtuple
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from typing import TYPE_CHECKING, Optional, Dict, Iterator, List, Any, Tuple
+
+if TYPE_CHECKING:
+    from langsmith import Client
+
+# Only this evaluator's runs are synced, so the API is asked for nothing else
+_EVALUATOR_NAME = 'detailed_similarity_evaluator'
+_EVALUATOR_RUN_FILTER = f'eq(name, "{_EVALUATOR_NAME}")'
+# Run fields requested from the API: what the sync reads (metadata lives in extra) plus the
+# fields the Run model requires; costs, tokens, events, tags etc. are left on the server
+_RUN_SELECT = ('id', 'name', 'run_type', 'trace_id', 'start_time', 'inputs', 'outputs', 'extra')
+
+# Experiment type by experiment name prefix; latest_experiments keeps one experiment per type and date
+_EXPERIMENT_TYPE_BY_PREFIX = {
+    'management-pay': 'management',
+    'homeowner-pay': 'homeowner',
+    'implementation': 'implementation'
+}
+
+# Read-side tuning for the shared query connection: 256 MB memory map, 64 MB page cache
+_READ_PRAGMAS = ('mmap_size=268435456', 'cache_size=-65536', 'temp_store=MEMORY')
+
+# Write-side tuning for sync inserts: WAL keeps dashboard readers unblocked and, with
+# synchronous=NORMAL, avoids an fsync of the main database file on every commit; each
+# sync checkpoints afterwards so the tracked .db file never depends on its -wal file
+_WRITE_PRAGMAS = ('journal_mode=WAL', 'synchronous=NORMAL', 'temp_store=MEMORY', 'cache_size=-65536')
+
+# Run attributes used during sync, read once per run; start_time is the ISO string
+# and date its YYYY-MM-DD prefix, formatted once rather than in each extractor
+_RunFields = namedtuple('_RunFields', 'id name inputs outputs metadata start_time date')
+
+def _unpack_run(run) -> _RunFields:
+    """Unpack the run attributes used during sync in a single pass"""
+    fields = run.__dict__
+    extra = fields.get('extra') or {}
+    start_time = fields.get('start_time')
+    start_time = start_time.isoformat() if start_time else None
+    return _RunFields(
+        fields.get('id'),
+        fields.get('name'),
+        fields.get('inputs'),
+        fields.get('outputs'),
+        extra.get('metadata'),
+        start_time,
+        start_time[:10] if start_time else None
+    )
+
+@lru_cache(maxsize=None)
+def _get_client(api_key: str) -> 'Client':
+    """Return a LangSmith client per API key, reused so its connection pool stays warm"""
+    # Imported here so the dashboard, which only reads the database, doesn't pay for langsmith at startup
+    from langsmith import Client
+    return Client(api_key=api_key)
+
+def _resolve_ticket(inputs) -> Tuple[Any, Any]:
+    """Resolve (ticket_id, ticket_type) from run inputs, trying each known location in order"""
+    try:
+        return inputs['ticket_id'], None
+    except (KeyError, TypeError):
+        pass
+    
+    try:
+        ticket = inputs['ticket']
+        return ticket.get('id'), ticket.get('type')
+    except (KeyError, TypeError, AttributeError):
+        return None, None
 
 class EvaluationDatabase:
     """Database manager for evaluation data from LangSmith"""
     
     def __init__(self, db_path: str = 'merged_evaluation.db'):
         self.db_path = db_path
+        self._read_conn = None
+        self._read_lock = threading.Lock()
         self.init_database()
     
+    def _read_connection(self) -> sqlite3.Connection:
+        """Return the shared connection used for read queries, opening it on first use"""
+        if self._read_conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            for pragma in _READ_PRAGMAS:
+                conn.execute(f'PRAGMA {pragma}')
+            self._read_conn = conn
+        return self._read_conn
+    
+    def _write_connection(self) -> sqlite3.Connection:
+        """Open a connection for bulk inserts with the write-side PRAGMAs applied"""
+        conn = sqlite3.connect(self.db_path)
+        for pragma in _WRITE_PRAGMAS:
+            conn.execute(f'PRAGMA {pragma}')
+        return conn
+    
+    def _read_query(self, query: str, params=None) -> pd.DataFrame:
+        """Run a read query on the shared connection, one caller at a time"""
+        with self._read_lock:
+            return pd.read_sql_query(query, self._read_connection(), params=params)
+    
     def init_database(self):
         """Initialize database tables"""
         conn = sqlite3.connect(self.db_path)
@@ -85,7 +176,7 @@ class EvaluationDatabase:
     def fetch_and_sync_data(self, api_key: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> bool:
         """Fetch data from LangSmith and sync to database"""
         try:
-            client = Client(api_key=api_key)
+            client = _get_client(api_key)
             
             # Set default date range if not provided
             if not start_date:
@@ -95,97 +186,67 @@ class EvaluationDatabase:
             
             print(f"Fetching data from {start_date} to {end_date}")
             
-            # Fetch runs for the date range
-            start_time = datetime.strptime(f"{start_date} 00:00:00", "%Y-%m-%d %H:%M:%S")
-            end_time = datetime.strptime(f"{end_date} 23:59:59", "%Y-%m-%d %H:%M:%S")
-            
-            runs = client.list_runs(
-                project_name="evaluators",
-                start_time=start_time,
-                end_time=end_time,
-                limit=1000
-            )
+            # Fetch runs for the date range, one request per day in parallel
+            days = pd.date_range(start_date, end_date, freq='D').to_pydatetime()
+            runs = self._iter_runs(client, days)
+            valid_dates = frozenset(day.strftime('%Y-%m-%d') for day in days)
             
             # Process runs and store in database
             evaluation_data = []
-            experiment_data = []
-            
-            # Track experiments by date to only keep the last set of three
-            experiments_by_date = {}
-            
-            # Track run counts for each experiment name
-            experiment_run_counts = {}
+            # Latest experiments are selected as runs arrive: a run count per experiment name
+            # and the most recent run per (date, experiment type)
+            run_counts = Counter()
+            latest_experiments = {}
             
             for run in runs:
-                if run.name == "detailed_similarity_evaluator" and run.outputs:
-                    # Extract evaluation data
-                    eval_data = self._extract_evaluation_data(run)
-                    if eval_data:
-                        evaluation_data.append(eval_data)
-                    
-                    # Extract experiment data
-                    exp_data = self._extract_experiment_data(run)
-                    if exp_data:
-                        # Count runs for this experiment
-                        exp_name = exp_data['experiment_name']
-                        if exp_name not in experiment_run_counts:
-                            experiment_run_counts[exp_name] = 0
-                        experiment_run_counts[exp_name] += 1
-                        
-                        # Group experiments by date
-                        date = exp_data['date']
-                        if date not in experiments_by_date:
-                            experiments_by_date[date] = []
-                        experiments_by_date[date].append(exp_data)
-                
-                # Rate limiting
-                time.sleep(0.1)
-            
-            # For each date, only keep the last set of three experiments (management-pay, homeowner-pay, implementation)
-            for date, experiments in experiments_by_date.items():
-                # Sort experiments by start time (most recent first)
-                experiments.sort(key=lambda x: x['start_time'], reverse=True)
+                run = _unpack_run(run)
                 
-                # Keep only the most recent set of three experiments
-                # Look for experiments starting with the expected prefixes
-                kept_experiments = []
-                seen_prefixes = set()
+                # Cheapest, most selective checks first
+                if run.name != _EVALUATOR_NAME or not run.outputs:
+                    continue
+                experiment_name = run.metadata.get('experiment') if run.metadata else None
+                if experiment_name and experiment_name.startswith('zendesk'):
+                    continue
+                if run.date and run.date not in valid_dates:
+                    continue
                 
-                for exp in experiments:
-                    exp_name = exp['experiment_name']
-                    prefix = None
-                    
-                    if exp_name.startswith('management-pay'):
-                        prefix = 'management-pay'
-                    elif exp_name.startswith('homeowner-pay'):
-                        prefix = 'homeowner-pay'
-                    elif exp_name.startswith('implementation'):
-                        prefix = 'implementation'
-                    
-                    if prefix and prefix not in seen_prefixes:
-                        seen_prefixes.add(prefix)
-                        # Update the run count with the actual count
-                        exp['run_count'] = experiment_run_counts.get(exp_name, 1)
-                        kept_experiments.append(exp)
-                    
-                    # Stop once we have all three
-                    if len(kept_experiments) >= 3:
-                        break
+                # Extract evaluation data
+                eval_data = self._extract_evaluation_data(run)
+                if eval_data:
+                    evaluation_data.append(eval_data)
                 
-                # Replace the experiments list with only the kept ones
-                experiments_by_date[date] = kept_experiments
+                # Extract experiment data
+                exp_data = self._extract_experiment_data(run)
+                if exp_data:
+                    run_counts[exp_data['experiment_name']] += 1
+                    if exp_data['experiment_type']:
+                        key = (exp_data['date'], exp_data['experiment_type'])
+                        latest = latest_experiments.get(key)
+                        if latest is None or (exp_data['start_time'] or '') > (latest['start_time'] or ''):
+                            latest_experiments[key] = exp_data
             
-            # Flatten the kept experiments
-            final_experiments = []
-            for experiments in experiments_by_date.values():
-                final_experiments.extend(experiments)
-            
-            # Store data in database
-            if evaluation_data:
-                self._store_evaluations(evaluation_data)
+            # Newest first, runs without a start time last
+            final_experiments = sorted(
+                latest_experiments.values(),
+                key=lambda exp_data: (exp_data['start_time'] is not None, exp_data['start_time'] or ''),
+                reverse=True
+            )
+            for exp_data in final_experiments:
+                exp_data['run_count'] = run_counts[exp_data['experiment_name']]
             
-            if final_experiments:
-                self._store_experiments(final_experiments)
+            # Store data in database, both tables in one transaction
+            conn = self._write_connection()
+            try:
+                with conn:
+                    if evaluation_data:
+                        self._store_evaluations(conn, evaluation_data)
+                    
+                    if final_experiments:
+                        self._store_experiments(conn, final_experiments)
+                # Fold the WAL back into the database file so a copy of the .db alone has the synced rows
+                conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            finally:
+                conn.close()
             
             print(f"Successfully processed {len(evaluation_data)} evaluations and {len(final_experiments)} experiments")
             return True
@@ -194,7 +255,33 @@ class EvaluationDatabase:
             print(f"Error fetching data: {e}")
             return False
     
-    def _extract_evaluation_data(self, run) -> Optional[Dict[str, Any]]:
+    def _iter_runs(self, client: 'Client', days: List[datetime], max_workers: int = 8) -> Iterator[Any]:
+        """Yield runs for the given days, fetched one request per day across a thread pool"""
+        def fetch_day(day: datetime) -> List[Any]:
+            # Filtering by run name server-side keeps other evaluators' runs off the wire
+            return list(client.list_runs(
+                project_name="evaluators",
+                start_time=day,
+                end_time=day + timedelta(days=1) - timedelta(seconds=1),
+                filter=_EVALUATOR_RUN_FILTER,
+                select=_RUN_SELECT,
+                limit=1000
+            ))
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for day in days:
+                futures.append(executor.submit(fetch_day, day))
+                # Rate limiting
+                time.sleep(0.1)
+            
+            # Hand each day's runs over as soon as that day is done instead of concatenating
+            # every day into one list, and drop the future so its runs can be freed once processed
+            for i, future in enumerate(futures):
+                futures[i] = None
+                yield from future.result()
+    
+    def _extract_evaluation_data(self, run: _RunFields) -> Optional[Dict[str, Any]]:
         """Extract evaluation data from a run"""
         try:
             # Get outputs
@@ -203,18 +290,7 @@ class EvaluationDatabase:
                 return None
             
             # Extract ticket information
-            ticket_id = None
-            ticket_type = None
-            
-            if hasattr(run, 'inputs') and run.inputs:
-                inputs = run.inputs
-                if isinstance(inputs, dict):
-                    # Try to extract ticket info from various possible locations
-                    if 'ticket_id' in inputs:
-                        ticket_id = inputs['ticket_id']
-                    elif 'ticket' in inputs and isinstance(inputs['ticket'], dict):
-                        ticket_id = inputs['ticket'].get('id')
-                        ticket_type = inputs['ticket'].get('type')
+            ticket_id, ticket_type = _resolve_ticket(run.inputs)
             
             # Extract quality and comment from outputs
             quality = None
@@ -222,30 +298,24 @@ class EvaluationDatabase:
             score = None
             
             if isinstance(outputs, dict):
-                if 'quality' in outputs:
-                    quality = outputs['quality']
-                    # Standardize quality naming
-                    if quality == 'copy_paste':
-                        quality = 'high_quality'
-                if 'comment' in outputs:
-                    comment = outputs['comment']
-                if 'score' in outputs:
-                    score = outputs['score']
+                quality = outputs.get('quality')
+                # Standardize quality naming
+                if quality == 'copy_paste':
+                    quality = 'high_quality'
+                comment = outputs.get('comment')
+                score = outputs.get('score')
             
             # Get experiment name
             experiment_name = None
-            if hasattr(run, 'metadata') and run.metadata:
+            if run.metadata:
                 experiment_name = run.metadata.get('experiment')
             
             # Skip zendesk evaluations
             if experiment_name and experiment_name.startswith('zendesk'):
                 return None
             
-            # Get date from start time
-            date = run.start_time.strftime('%Y-%m-%d') if run.start_time else None
-            
             return {
-                'date': date,
+                'date': run.date,
                 'ticket_id': ticket_id,
                 'ticket_type': ticket_type,
                 'quality': quality,
@@ -253,18 +323,18 @@ class EvaluationDatabase:
                 'score': score,
                 'experiment_name': experiment_name,
                 'run_id': str(run.id),
-                'start_time': run.start_time.isoformat() if run.start_time else None,
-                'evaluation_key': 'detailed_similarity_evaluator'
+                'start_time': run.start_time,
+                'evaluation_key': _EVALUATOR_NAME
             }
             
         except Exception as e:
             print(f"Error extracting evaluation data: {e}")
             return None
     
-    def _extract_experiment_data(self, run) -> Optional[Dict[str, Any]]:
+    def _extract_experiment_data(self, run: _RunFields) -> Optional[Dict[str, Any]]:
         """Extract experiment data from a run"""
         try:
-            if not hasattr(run, 'metadata') or not run.metadata:
+            if not run.metadata:
                 return None
             
             experiment_name = run.metadata.get('experiment')
@@ -275,70 +345,43 @@ class EvaluationDatabase:
             if experiment_name.startswith('zendesk'):
                 return None
             
-            # Determine experiment type from name
-            experiment_type = None
-            if 'implementation' in experiment_name:
-                experiment_type = 'implementation'
-            elif 'homeowner' in experiment_name:
-                experiment_type = 'homeowner'
-            elif 'management' in experiment_name:
-                experiment_type = 'management'
-            
-            date = run.start_time.strftime('%Y-%m-%d') if run.start_time else None
+            # Determine experiment type from the name prefix
+            experiment_type = next(
+                (exp_type for prefix, exp_type in _EXPERIMENT_TYPE_BY_PREFIX.items() if experiment_name.startswith(prefix)),
+                None
+            )
             
             return {
-                'date': date,
+                'date': run.date,
                 'experiment_type': experiment_type,
                 'experiment_name': experiment_name,
-                'start_time': run.start_time.isoformat() if run.start_time else None,
-                'run_count': 0  # Will be updated later with actual count
+                'start_time': run.start_time,
+                'run_count': 0  # Filled in from the per-experiment run counts during sync
             }
             
         except Exception as e:
             print(f"Error extracting experiment data: {e}")
             return None
     
-    def _store_evaluations(self, evaluation_data: List[Dict[str, Any]]):
+    def _store_evaluations(self, conn: sqlite3.Connection, evaluation_data: List[Dict[str, Any]]):
         """Store evaluation data in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        for data in evaluation_data:
-            cursor.execute('''
-                INSERT OR REPLACE INTO evaluations 
-                (date, ticket_id, ticket_type, quality, comment, score, experiment_name, run_id, start_time, evaluation_key)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data['date'], data['ticket_id'], data['ticket_type'], data['quality'],
-                data['comment'], data['score'], data['experiment_name'], data['run_id'],
-                data['start_time'], data['evaluation_key']
-            ))
-        
-        conn.commit()
-        conn.close()
+        # One executemany; the row dicts bind straight to the named parameters
+        conn.executemany('''
+            INSERT OR REPLACE INTO evaluations 
+            (date, ticket_id, ticket_type, quality, comment, score, experiment_name, run_id, start_time, evaluation_key)
+            VALUES (:date, :ticket_id, :ticket_type, :quality, :comment, :score, :experiment_name, :run_id, :start_time, :evaluation_key)
+        ''', evaluation_data)
     
-    def _store_experiments(self, experiment_data: List[Dict[str, Any]]):
+    def _store_experiments(self, conn: sqlite3.Connection, experiment_data: List[Dict[str, Any]]):
         """Store experiment data in database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        for data in experiment_data:
-            cursor.execute('''
-                INSERT OR REPLACE INTO latest_experiments 
-                (date, experiment_type, experiment_name, start_time, run_count)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                data['date'], data['experiment_type'], data['experiment_name'],
-                data['start_time'], data['run_count']
-            ))
-        
-        conn.commit()
-        conn.close()
+        conn.executemany('''
+            INSERT OR REPLACE INTO latest_experiments 
+            (date, experiment_type, experiment_name, start_time, run_count)
+            VALUES (:date, :experiment_type, :experiment_name, :start_time, :run_count)
+        ''', experiment_data)
     
-    def get_evaluation_summary(self) -> pd.DataFrame:
-        """Get evaluation summary data"""
-        conn = sqlite3.connect(self.db_path)
-        
+    def get_evaluation_summary(self, exclude_experiment_prefix: Optional[str] = None) -> pd.DataFrame:
+        """Get evaluation summary data, optionally skipping experiments with the given name prefix"""
         query = '''
             SELECT 
                 date,
@@ -349,19 +392,16 @@ class EvaluationDatabase:
                 experiment_name
             FROM evaluations
             WHERE ticket_type IS NOT NULL AND quality IS NOT NULL
+                AND (:prefix IS NULL OR experiment_name IS NULL
+                     OR substr(experiment_name, 1, length(:prefix)) != :prefix)
             GROUP BY date, ticket_type, quality, experiment_name
             ORDER BY date DESC, ticket_type, quality
         '''
         
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        return df
+        return self._read_query(query, {'prefix': exclude_experiment_prefix})
     
-    def get_latest_experiments_info(self) -> pd.DataFrame:
-        """Get latest experiments information"""
-        conn = sqlite3.connect(self.db_path)
-        
+    def get_latest_experiments_info(self, exclude_experiment_prefix: Optional[str] = None) -> pd.DataFrame:
+        """Get latest experiments information, optionally skipping experiments with the given name prefix"""
         query = '''
             SELECT 
                 date,
@@ -370,22 +410,20 @@ class EvaluationDatabase:
                 run_count,
                 updated_at
             FROM latest_experiments
+            WHERE :prefix IS NULL OR experiment_name IS NULL
+                OR substr(experiment_name, 1, length(:prefix)) != :prefix
             ORDER BY date DESC, experiment_type
         '''
         
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        return df
+        return self._read_query(query, {'prefix': exclude_experiment_prefix})
     
     def get_daily_breakdown(self, start_date: Optional[str] = None, end_date: Optional[str] = None) -> pd.DataFrame:
         """Get daily breakdown of evaluations"""
-        conn = sqlite3.connect(self.db_path)
-        
+        today = datetime.now()
         if not start_date:
-            start_date = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+            start_date = (today - timedelta(days=30)).strftime('%Y-%m-%d')
         if not end_date:
-            end_date = datetime.now().strftime('%Y-%m-%d')
+            end_date = today.strftime('%Y-%m-%d')
         
         query = '''
             SELECT 
@@ -399,64 +437,46 @@ class EvaluationDatabase:
             FROM evaluations
             WHERE date BETWEEN ? AND ?
             GROUP BY date, ticket_type
-            ORDER BY date DESC, ticket_type
+            ORDER BY date, ticket_type
         '''
         
-        df = pd.read_sql_query(query, conn, params=[start_date, end_date])
-        conn.close()
-        
-        return df
+        return self._read_query(query, [start_date, end_date])
     
     def get_quality_distribution(self) -> pd.DataFrame:
         """Get quality distribution across all data"""
-        conn = sqlite3.connect(self.db_path)
-        
         query = '''
             SELECT 
                 quality,
                 COUNT(*) as count,
-                ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM evaluations WHERE quality IS NOT NULL), 2) as percentage
+                ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER (), 2) as percentage
             FROM evaluations
             WHERE quality IS NOT NULL
             GROUP BY quality
             ORDER BY count DESC
         '''
         
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        return df
+        return self._read_query(query)
     
     def get_latest_date(self) -> Optional[str]:
         """Get the latest date from the database"""
-        conn = sqlite3.connect(self.db_path)
-        try:
-            cursor = conn.cursor()
-            cursor.execute('SELECT MAX(date) FROM evaluations WHERE date IS NOT NULL')
-            result = cursor.fetchone()
-            return result[0] if result and result[0] else None
-        finally:
-            conn.close()
+        with self._read_lock:
+            result = self._read_connection().execute('SELECT MAX(date) FROM evaluations WHERE date IS NOT NULL').fetchone()
+        return result[0] if result and result[0] else None
     
     def get_ticket_type_distribution(self) -> pd.DataFrame:
         """Get ticket type distribution"""
-        conn = sqlite3.connect(self.db_path)
-        
         query = '''
             SELECT 
                 ticket_type,
                 COUNT(*) as count,
-                ROUND(COUNT(*) * 100.0 / (SELECT COUNT(*) FROM evaluations WHERE ticket_type IS NOT NULL), 2) as percentage
+                ROUND(COUNT(*) * 100.0 / SUM(COUNT(*)) OVER (), 2) as percentage
             FROM evaluations
             WHERE ticket_type IS NOT NULL
             GROUP BY ticket_type
             ORDER BY count DESC
         '''
         
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        return df
+        return self._read_query(query)
     
     def debug_database_contents(self):
         """Debug function to show database contents"""
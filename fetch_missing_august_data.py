@@ -9,9 +9,17 @@ import pandas as pd
 import sqlite3
 from datetime import datetime, timedelta
 from langsmith import Client
+import heapq
 import re
 import time
 
+# Dates absent from the merged database; the list keeps fetch/display order, the set serves membership checks
+MISSING_DATES = [
+    "2025-08-15", "2025-08-16", "2025-08-17",
+    "2025-08-23", "2025-08-24", "2025-08-25", "2025-08-26", "2025-08-27"
+]
+MISSING_DATE_SET = frozenset(MISSING_DATES)
+
 def get_api_key():
     api_key = os.getenv('LANGSMITH_API_KEY')
     if api_key:
@@ -27,11 +35,6 @@ def analyze_existing_databases():
     """First analyze what we have in existing databases"""
     print("=== ANALYZING EXISTING DATABASES ===")
     
-    missing_dates = [
-        "2025-08-15", "2025-08-16", "2025-08-17",
-        "2025-08-23", "2025-08-24", "2025-08-25", "2025-08-26", "2025-08-27"
-    ]
-    
     db_files = [
         'comprehensive_evaluation.db',
         'comprehensive_merged_evaluation.db', 
@@ -61,24 +64,25 @@ def analyze_existing_databases():
                 eval_table = 'ticket_evaluations'
             
             if eval_table:
-                # Get all August dates
-                august_df = pd.read_sql_query(f'''
-                    SELECT date, COUNT(*) as count
+                # One grouped scan per database; the per-date totals are summed from the per-experiment counts
+                exp_df = pd.read_sql_query(f'''
+                    SELECT date, experiment_name, COUNT(*) as count
                     FROM {eval_table}
                     WHERE date LIKE '2025-08-%'
-                    GROUP BY date
-                    ORDER BY date
+                    GROUP BY date, experiment_name
+                    ORDER BY date, experiment_name
                 ''', conn)
+                august_df = exp_df.groupby('date', sort=False)['count'].sum().reset_index()
                 
                 print(f"August dates in {eval_table}:")
                 if not august_df.empty:
                     for _, row in august_df.iterrows():
-                        status = "MISSING" if row['date'] in missing_dates else "FOUND"
+                        status = "MISSING" if row['date'] in MISSING_DATE_SET else "FOUND"
                         print(f"  {row['date']}: {row['count']} evaluations [{status}]")
                     
                     # Check for missing dates specifically
                     found_dates = set(august_df['date'].tolist())
-                    missing_in_db = [d for d in missing_dates if d not in found_dates]
+                    missing_in_db = sorted(MISSING_DATE_SET - found_dates)
                     
                     if missing_in_db:
                         print(f"Missing in this database: {missing_in_db}")
@@ -87,23 +91,9 @@ def analyze_existing_databases():
                 else:
                     print("  No August data found")
                 
-                # Get experiment names for August dates
-                if eval_table == 'evaluations':
-                    exp_df = pd.read_sql_query(f'''
-                        SELECT date, experiment_name, COUNT(*) as count
-                        FROM {eval_table}
-                        WHERE date LIKE '2025-08-%'
-                        GROUP BY date, experiment_name
-                        ORDER BY date, experiment_name
-                    ''', conn)
-                else:
-                    exp_df = pd.read_sql_query(f'''
-                        SELECT date, experiment_name, COUNT(*) as count
-                        FROM {eval_table}
-                        WHERE date LIKE '2025-08-%' AND experiment_name IS NOT NULL
-                        GROUP BY date, experiment_name
-                        ORDER BY date, experiment_name
-                    ''', conn)
+                # Experiment names for August dates; only the evaluations table lists unnamed runs
+                if eval_table != 'evaluations':
+                    exp_df = exp_df[exp_df['experiment_name'].notna()]
                 
                 if not exp_df.empty:
                     print(f"\nExperiment names by date:")
@@ -157,23 +147,10 @@ def safe_fetch_with_timeout_handling(api_key, target_dates, max_retries=3):
                         limit=500
                     )
                     
-                    # Convert to list with timeout handling
-                    runs_list = []
-                    run_count = 0
-                    fetch_start_time = time.time()
-                    timeout_seconds = 30  # 30 second timeout per date
-                    
-                    for run in runs:
-                        if time.time() - fetch_start_time > timeout_seconds:
-                            print(f"    Timeout reached after {timeout_seconds}s, got {run_count} runs")
-                            break
-                        runs_list.append(run)
-                        run_count += 1
-                    
-                    print(f"  Retrieved {len(runs_list)} runs for {date_str}")
-                    
-                    # Analyze runs for this date
-                    date_analysis = analyze_runs_for_date(runs_list, date_str)
+                    # Analyze runs as they stream in, with a 30 second timeout per date
+                    date_analysis = analyze_runs_for_date(iter_runs_with_timeout(runs, timeout_seconds=30), date_str)
+                    print(f"  Retrieved {date_analysis['total_runs']} runs for {date_str}")
+                    print_date_analysis(date_analysis, date_str)
                     findings[date_str] = date_analysis
                     
                     # Success - break retry loop
@@ -219,53 +196,75 @@ def safe_fetch_with_timeout_handling(api_key, target_dates, max_retries=3):
         print(f"Fatal error in safe fetch: {e}")
         return {}
 
-def analyze_runs_for_date(runs_list, date_str):
-    """Analyze runs for a specific date"""
+def iter_runs_with_timeout(runs, timeout_seconds):
+    """Yield runs from the API generator until timeout_seconds have passed"""
+    run_count = 0
+    fetch_start_time = time.time()
+    
+    for run in runs:
+        if time.time() - fetch_start_time > timeout_seconds:
+            print(f"    Timeout reached after {timeout_seconds}s, got {run_count} runs")
+            break
+        yield run
+        run_count += 1
+
+def analyze_runs_for_date(runs, date_str):
+    """Analyze runs for a specific date in one pass over the runs iterable"""
     date_analysis = {
-        'total_runs': len(runs_list),
+        'total_runs': 0,
         'detailed_eval_runs': 0,
         'detailed_with_outputs': 0,
         'experiments': set(),
         'sample_experiments': []
     }
     
-    for run in runs_list:
+    for run in runs:
+        date_analysis['total_runs'] += 1
         if run.name == "detailed_similarity_evaluator":
             date_analysis['detailed_eval_runs'] += 1
             
-            if run.outputs:
+            # Each run attribute goes through the model's accessors, so read them once
+            has_outputs = bool(run.outputs)
+            if has_outputs:
                 date_analysis['detailed_with_outputs'] += 1
             
             # Get experiment name
-            experiment = None
-            if hasattr(run, "metadata") and run.metadata and isinstance(run.metadata, dict):
-                experiment = run.metadata.get("experiment")
+            metadata = getattr(run, "metadata", None)
+            experiment = metadata.get("experiment") if metadata and isinstance(metadata, dict) else None
             
             if experiment:
                 date_analysis['experiments'].add(experiment)
                 if len(date_analysis['sample_experiments']) < 5:
                     date_analysis['sample_experiments'].append({
                         'experiment': experiment,
-                        'has_outputs': bool(run.outputs),
+                        'has_outputs': has_outputs,
                         'run_id': str(getattr(run, 'id', 'No ID'))
                     })
     
-    print(f"  Analysis for {date_str}:")
-    print(f"    Total runs: {date_analysis['total_runs']}")
-    print(f"    Detailed evaluator runs: {date_analysis['detailed_eval_runs']}")
-    print(f"    With outputs: {date_analysis['detailed_with_outputs']}")
-    print(f"    Unique experiments: {len(date_analysis['experiments'])}")
+    return date_analysis
+
+def print_date_analysis(date_analysis, date_str):
+    """Print the analysis summary for a specific date"""
+    # Collect the lines and write them in one call rather than a print per line
+    lines = [
+        f"  Analysis for {date_str}:",
+        f"    Total runs: {date_analysis['total_runs']}",
+        f"    Detailed evaluator runs: {date_analysis['detailed_eval_runs']}",
+        f"    With outputs: {date_analysis['detailed_with_outputs']}",
+        f"    Unique experiments: {len(date_analysis['experiments'])}"
+    ]
     
     if date_analysis['experiments']:
-        print(f"    Experiment names:")
+        lines.append(f"    Experiment names:")
+        compact_date = date_str.replace('-', '')
         for exp in sorted(date_analysis['experiments']):
             # Check if experiment name contains the date
-            if date_str.replace('-', '') in exp or date_str in exp:
-                print(f"      ✓ {exp}")
+            if compact_date in exp or date_str in exp:
+                lines.append(f"      ✓ {exp}")
             else:
-                print(f"      ? {exp} (date mismatch?)")
+                lines.append(f"      ? {exp} (date mismatch?)")
     
-    return date_analysis
+    print("\n".join(lines))
 
 def store_findings_to_database(findings, db_path='merged_evaluation.db'):
     """Store findings about available data to the database for future reference"""
@@ -369,7 +368,7 @@ def analyze_experiment_patterns():
         for pattern_type, exps in patterns.items():
             if exps:
                 print(f"\n{pattern_type.upper()} experiments ({len(exps)}):")
-                for exp in sorted(exps)[:5]:  # Show first 5
+                for exp in heapq.nsmallest(5, exps):  # Show first 5
                     print(f"  {exp}")
                 if len(exps) > 5:
                     print(f"  ... and {len(exps) - 5} more")
@@ -399,13 +398,8 @@ def main():
     print("Waiting 60 seconds for rate limits to reset...")
     time.sleep(60)
     
-    missing_dates = [
-        "2025-08-15", "2025-08-16", "2025-08-17",
-        "2025-08-23", "2025-08-24", "2025-08-25", "2025-08-26", "2025-08-27"
-    ]
-    
     try:
-        findings = safe_fetch_with_rate_limit_handling(api_key, missing_dates)
+        findings = safe_fetch_with_rate_limit_handling(api_key, MISSING_DATES)
         
         if findings:
             print(f"\n=== CONCLUSIONS ===")
@@ -425,20 +419,24 @@ def main():
                 else:
                     dates_with_data.append(date_str)
             
-            print(f"Dates with processable data: {dates_with_data}")
-            print(f"Dates with no detailed evaluator runs: {dates_no_runs}")
-            print(f"Dates with runs but no outputs: {dates_no_outputs}")
-            print(f"Dates with outputs but no experiment metadata: {dates_no_experiments}")
+            lines = [
+                f"Dates with processable data: {dates_with_data}",
+                f"Dates with no detailed evaluator runs: {dates_no_runs}",
+                f"Dates with runs but no outputs: {dates_no_outputs}",
+                f"Dates with outputs but no experiment metadata: {dates_no_experiments}"
+            ]
             
             if dates_with_data:
-                print(f"\nRecommendation: The missing dates DO have evaluation data available")
-                print(f"The issue is likely in the processing logic or database insertion")
+                lines.append(f"\nRecommendation: The missing dates DO have evaluation data available")
+                lines.append(f"The issue is likely in the processing logic or database insertion")
             elif dates_no_outputs:
-                print(f"\nRecommendation: Evaluation runs exist but are not completed yet")
-                print(f"Wait for evaluations to finish or check evaluation status in LangSmith")
+                lines.append(f"\nRecommendation: Evaluation runs exist but are not completed yet")
+                lines.append(f"Wait for evaluations to finish or check evaluation status in LangSmith")
             elif dates_no_runs:
-                print(f"\nRecommendation: No evaluation runs were created for these dates")
-                print(f"Check if evaluation system was running on these dates")
+                lines.append(f"\nRecommendation: No evaluation runs were created for these dates")
+                lines.append(f"Check if evaluation system was running on these dates")
+            
+            print("\n".join(lines))
         
     except Exception as e:
         print(f"Rate limit still active or other error: {e}")
@@ -448,11 +446,6 @@ def check_merged_database():
     """Check what dates exist in merged_evaluation.db"""
     print("=== CHECKING MERGED_EVALUATION.DB ===")
     
-    missing_dates = [
-        "2025-08-15", "2025-08-16", "2025-08-17", 
-        "2025-08-23", "2025-08-24", "2025-08-25", "2025-08-26", "2025-08-27"
-    ]
-    
     db_file = 'merged_evaluation.db'
     if not os.path.exists(db_file):
         print(f"Database {db_file} not found!")
@@ -473,9 +466,10 @@ def check_merged_database():
         ''', conn)
         
         if not df.empty:
+            # Split the target dates with set operations; ISO dates sort back into calendar order
             found_dates = set(df['date'].tolist())
-            missing_in_db = [d for d in missing_dates if d not in found_dates]
-            found_missing_dates = [d for d in missing_dates if d in found_dates]
+            missing_in_db = sorted(MISSING_DATE_SET - found_dates)
+            found_missing_dates = sorted(found_dates & MISSING_DATE_SET)
             
             print(f"Total August dates in database: {len(df)}")
             print(f"Target dates already found: {len(found_missing_dates)}")
@@ -489,17 +483,17 @@ def check_merged_database():
             
             print("\nAll August dates in merged database:")
             for _, row in df.iterrows():
-                status = "TARGET-MISSING" if row['date'] in missing_dates else "FOUND"
+                status = "TARGET-MISSING" if row['date'] in MISSING_DATE_SET else "FOUND"
                 print(f"  {row['date']}: {row['count']} evaluations [{status}]")
             
             return missing_in_db
         else:
             print("No August data found in merged database")
-            return missing_dates
+            return list(MISSING_DATES)
     
     except Exception as e:
         print(f"Error checking merged database: {e}")
-        return missing_dates
+        return list(MISSING_DATES)
     
     finally:
         conn.close()
@@ -508,11 +502,6 @@ def quick_database_date_check():
     """Quick check of what dates exist in databases without API calls"""
     print("=== QUICK DATABASE DATE CHECK ===")
     
-    missing_dates = [
-        "2025-08-15", "2025-08-16", "2025-08-17", 
-        "2025-08-23", "2025-08-24", "2025-08-25", "2025-08-26", "2025-08-27"
-    ]
-    
     # Check merged database first
     still_missing = check_merged_database()
     
@@ -543,8 +532,8 @@ def quick_database_date_check():
             
             if not df.empty:
                 found_dates = set(df['date'].tolist())
-                missing_in_this_db = [d for d in missing_dates if d not in found_dates]
-                found_missing_dates = [d for d in missing_dates if d in found_dates]
+                missing_in_this_db = sorted(MISSING_DATE_SET - found_dates)
+                found_missing_dates = sorted(found_dates & MISSING_DATE_SET)
                 
                 print(f"August dates: {len(df)} total")
                 print(f"Missing target dates in this DB: {len(missing_in_this_db)}")
@@ -559,7 +548,7 @@ def quick_database_date_check():
                 # Show all August dates for context
                 print("All August dates in this database:")
                 for _, row in df.iterrows():
-                    status = "TARGET" if row['date'] in missing_dates else ""
+                    status = "TARGET" if row['date'] in MISSING_DATE_SET else ""
                     print(f"  {row['date']}: {row['count']} {status}")
             else:
                 print("No August data found")
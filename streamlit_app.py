@@ -6,14 +6,20 @@ Streamlit application for visualizing evaluation data from LangSmith
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import numpy as np
+import pyarrow as pa
+import plotly.io as pio
 from datetime import datetime, timedelta
-import sqlite3
+from contextlib import contextmanager
+import time
+import math
+import os
 import re
 from evaluation_database import EvaluationDatabase
 
+# Serialize chart payloads with orjson instead of the stdlib json encoder
+pio.json.config.default_engine = 'orjson'
+
 # Page configuration
 st.set_page_config(
     page_title="LangSmith Evaluation Dashboard",
@@ -44,45 +50,335 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
-    """Load data from the database"""
+# YYYY-MM-DD date embedded in experiment names, compiled once at import
+EXPERIMENT_DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+def extract_date_from_experiment_name(exp_name):
+    """Extract date from experiment name format: type-evaluation-YYYY-MM-DD-hash"""
+    try:
+        # Look for YYYY-MM-DD pattern in the experiment name
+        date_match = EXPERIMENT_DATE_PATTERN.search(exp_name)
+        if date_match:
+            return date_match.group(1)
+        else:
+            # Fallback to database date if no date found in name
+            return None
+    except:
+        return None
+
+def build_experiments_display(latest_experiments):
+    """Format latest experiments for the display table"""
+    # Extract date from experiment_name instead of using database date. Names end in
+    # -YYYY-MM-DD-<8-char hash>, so the date is a fixed slice from the end; only names
+    # that don't fit that layout go through the per-name regex search
+    experiment_names = latest_experiments['experiment_name']
+    extracted_date = experiment_names.str.slice(-19, -9)
+    has_fixed_date = extracted_date.str.fullmatch(r'\d{4}-\d{2}-\d{2}', na=False)
+    extracted_date = extracted_date.where(has_fixed_date)
+    if not has_fixed_date.all():
+        extracted_date = extracted_date.fillna(experiment_names[~has_fixed_date].apply(extract_date_from_experiment_name))
+    
+    # Use extracted date if available, otherwise fall back to database date
+    # (stored as ISO text, so the YYYY-MM-DD prefix needs no datetime round-trip)
+    date = extracted_date.fillna(latest_experiments['date'].str[:10])
+    
+    # Assemble only the displayed columns rather than copying the whole frame
+    return pd.DataFrame({
+        'date': date,
+        'experiment_type': latest_experiments['experiment_type'],
+        'experiment_name': latest_experiments['experiment_name'],
+        'run_count': latest_experiments['run_count']
+    })
+
+def build_summary_tables(evaluation_summary):
+    """Convert the evaluation summary to Arrow tables, one per ticket type plus 'All'"""
+    summary_tables = {'All': pa.Table.from_pandas(evaluation_summary, preserve_index=False)}
+    # Groups keep the SQL row order either way; the tables are looked up by key, so skip sorting the keys
+    for ticket_type, group in evaluation_summary.groupby('ticket_type', sort=False, observed=True):
+        summary_tables[ticket_type] = pa.Table.from_pandas(group, preserve_index=False)
+    return summary_tables
+
+# Chart colors by quality label
+QUALITY_COLORS = {
+    'good': '#2E8B57',
+    'bad': '#FF6B6B',
+    'ugly': '#8B0000'
+}
+DAILY_TREND_COLORS = {
+    'Good': '#2E8B57',
+    'Bad': '#FF6B6B',
+    'Ugly': '#8B0000'
+}
+# Plotly's default qualitative palette, applied per bar in the ticket type chart
+TICKET_TYPE_COLORS = np.array(['#636EFA', '#EF553B', '#00CC96', '#AB63FA', '#FFA15A', '#19D3F3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52'])
+
+# Daily charts with more points than this render with WebGL (scattergl)
+WEBGL_POINT_THRESHOLD = 500
+
+# Integer count columns of the daily breakdown
+DAILY_COUNT_COLUMNS = ['total_evaluations', 'good_count', 'bad_count', 'ugly_count']
+
+# Upper bound on points per trace; longer series are downsampled with MinMaxLTTB
+MAX_CHART_POINTS = 1000
+# MinMax preselects this many candidates per output point before LTTB runs
+MINMAX_PRESELECT_RATIO = 4
+
+@st.cache_resource
+def get_database():
+    """Get the shared database manager (schema setup runs once, not on every rerun)"""
+    return EvaluationDatabase('merged_evaluation.db')
+
+@st.cache_resource
+def get_api_key():
+    """Look up the LangSmith API key once instead of re-reading env/secrets on every rerun"""
+    return get_database().get_api_key()
+
+def get_database_mtime():
+    """Modification time of the database, passed to cached loaders so a sync invalidates them"""
+    db_path = get_database().db_path
+    # Syncs write through WAL, so recent commits may only have touched the -wal file so far
+    db_mtime = os.path.getmtime(db_path)
+    try:
+        # The -wal file is deleted when the last connection closes, so it may vanish at any point
+        return max(db_mtime, os.path.getmtime(db_path + '-wal'))
+    except OSError:
+        return db_mtime
+
+# Only the entry for the current database file is ever read again
+@st.cache_data(max_entries=1)
+def load_data(db_mtime):
+    """Load data from the database (db_mtime only keys the cache)"""
     try:
-        db = EvaluationDatabase('merged_evaluation.db')
+        db = get_database()
         
-        # Get various data views
-        evaluation_summary = db.get_evaluation_summary()
-        daily_breakdown = db.get_daily_breakdown()
+        # Get various data views (zendesk experiments and evaluations are excluded in SQL)
+        evaluation_summary = db.get_evaluation_summary(exclude_experiment_prefix='zendesk')
         quality_distribution = db.get_quality_distribution()
         ticket_type_distribution = db.get_ticket_type_distribution()
-        latest_experiments = db.get_latest_experiments_info()
+        latest_experiments = db.get_latest_experiments_info(exclude_experiment_prefix='zendesk')
         
-        # Filter out zendesk experiments and evaluations from display
-        if not latest_experiments.empty:
-            latest_experiments = latest_experiments[~latest_experiments['experiment_name'].str.startswith('zendesk', na=False)]
+        # Counts fit comfortably in int32, which halves what gets hashed, pickled and serialized;
+        # the low-cardinality labels become categoricals so groupbys compare integer codes
+        evaluation_summary = evaluation_summary.astype({'ticket_type': 'category', 'quality': 'category', 'count': 'int32'})
         
-        if not evaluation_summary.empty:
-            evaluation_summary = evaluation_summary[~evaluation_summary['experiment_name'].str.startswith('zendesk', na=False)]
+        # Build display-ready Arrow tables once here so reruns skip the pandas -> Arrow conversion
+        evaluation_summary = evaluation_summary.assign(avg_score=evaluation_summary['avg_score'].round(2))
+        summary_tables = build_summary_tables(evaluation_summary)
+        ticket_types = ['All'] + sorted(ticket_type_distribution['ticket_type'].unique().tolist())
+        experiments_display = pa.Table.from_pandas(build_experiments_display(latest_experiments), preserve_index=False)
+        
+        # Charts over the full dataset don't depend on any filter, so build them once here too
+        quality_pie_chart = None
+        if not quality_distribution.empty:
+            quality_pie_chart = create_quality_pie_chart(quality_distribution)
+        ticket_type_chart = None
+        if not ticket_type_distribution.empty:
+            ticket_type_chart = create_ticket_type_chart(ticket_type_distribution)
+        experiment_type_chart = None
+        if not latest_experiments.empty:
+            experiment_type_chart = create_experiment_type_chart(latest_experiments['experiment_type'])
         
         return {
-            'evaluation_summary': evaluation_summary,
-            'daily_breakdown': daily_breakdown,
-            'quality_distribution': quality_distribution,
-            'ticket_type_distribution': ticket_type_distribution,
-            'latest_experiments': latest_experiments
+            'summary_tables': summary_tables,
+            'ticket_types': ticket_types,
+            'experiments_display': experiments_display,
+            'quality_pie_chart': quality_pie_chart,
+            'ticket_type_chart': ticket_type_chart,
+            'experiment_type_chart': experiment_type_chart,
+            'loaded_at': datetime.now().isoformat()
         }
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return None
 
+# Keyed on the database mtime too, so bound it to a handful of recent date ranges
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_daily_breakdown(start_date_str, end_date_str, db_mtime):
+    """Load the daily breakdown for the selected date range, filtered in SQL (db_mtime only keys the cache)"""
+    daily_breakdown = get_database().get_daily_breakdown(start_date_str, end_date_str)
+    # Same compact dtypes as load_data: int32 counts, categorical ticket type for the per-rerun filter
+    return daily_breakdown.astype({'ticket_type': 'category', **{column: 'int32' for column in DAILY_COUNT_COLUMNS}})
+
+def compute_summary_metrics(daily_data):
+    """Compute the key metrics with one sum over the count columns"""
+    # The int32 count block sums straight in NumPy, skipping pandas' per-column reduction dispatch
+    total_evaluations, good_count, bad_count, ugly_count = daily_data[DAILY_COUNT_COLUMNS].to_numpy().sum(axis=0).tolist()
+    return {
+        'total_evaluations': total_evaluations,
+        'avg_score': daily_data['avg_score'].mean(),
+        'good_count': good_count,
+        'bad_ugly_count': bad_count + ugly_count
+    }
+
+def format_summary_metrics(metrics):
+    """Format the key metrics as (label, value) pairs for the metric cards"""
+    avg_score = metrics['avg_score']
+    return [
+        ("Total Evaluations", f"{metrics['total_evaluations']:,}"),
+        ("Average Score", f"{avg_score:.2f}" if pd.notna(avg_score) else "N/A"),
+        ("Good Quality", f"{metrics['good_count']:,}"),
+        ("Bad/Ugly Quality", f"{metrics['bad_ugly_count']:,}")
+    ]
+
+def minmax_indices(y, max_points):
+    """Indices of about max_points samples, keeping the min and max of each bucket"""
+    bucket_size = math.ceil(len(y) / (max_points // 2))
+    buckets = pd.Series(y).groupby(np.arange(len(y)) // bucket_size)
+    return np.union1d(buckets.idxmin().to_numpy(), buckets.idxmax().to_numpy())
+
+def lttb_indices(positions, y, n_out):
+    """Indices of n_out samples chosen by Largest-Triangle-Three-Buckets, endpoints included"""
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    
+    positions = positions.astype(float)
+    y = y.astype(float)
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # The next bucket's centroid is the third triangle vertex (the last point for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = positions[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs(
+            (positions[previous] - next_x) * (y[start:end] - y[previous])
+            - (positions[previous] - positions[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+    return selected
+
+def downsample_minmax_lttb(x, y, max_points):
+    """Reduce a series to max_points with MinMax preselection followed by LTTB"""
+    if len(y) <= max_points:
+        return x, y
+    
+    # MinMax keeps the extremes cheaply so the LTTB loop only scans a bounded candidate set
+    candidates = np.arange(len(y))
+    if len(y) > max_points * MINMAX_PRESELECT_RATIO:
+        candidates = np.union1d(minmax_indices(y, max_points * MINMAX_PRESELECT_RATIO), [0, len(y) - 1])
+    keep = candidates[lttb_indices(candidates, y[candidates], max_points)]
+    return x[keep], y[keep]
+
+def create_quality_pie_chart(quality_data):
+    """Create the overall quality distribution pie chart"""
+    # Figures are plain dicts holding NumPy arrays, which Plotly ingests and encodes without per-element walks
+    return {
+        'data': [{
+            'type': 'pie',
+            'labels': quality_data['quality'].to_numpy(),
+            'values': quality_data['count'].to_numpy(),
+            'marker': {'colors': [QUALITY_COLORS.get(quality) for quality in quality_data['quality']]},
+            'textposition': 'inside',
+            'textinfo': 'percent+label'
+        }],
+        'layout': {
+            'title': {'text': "Overall Quality Distribution"},
+            'legend': {'tracegroupgap': 0}
+        }
+    }
+
+def create_ticket_type_chart(ticket_data):
+    """Create the ticket type distribution bar chart"""
+    # A single trace with per-bar colors instead of one trace per ticket type
+    colors = TICKET_TYPE_COLORS[np.arange(len(ticket_data)) % len(TICKET_TYPE_COLORS)]
+    return {
+        'data': [{
+            'type': 'bar',
+            'x': ticket_data['ticket_type'].to_numpy(),
+            'y': ticket_data['count'].to_numpy(),
+            'marker': {'color': colors}
+        }],
+        'layout': {
+            'title': {'text': "Ticket Type Distribution"},
+            'xaxis': {'title': {'text': 'ticket_type'}},
+            'yaxis': {'title': {'text': 'count'}}
+        }
+    }
+
+# Hashed on the breakdown contents, which change with every sync; same bound as load_daily_breakdown
+@st.cache_data(show_spinner=False, max_entries=8)
+def create_daily_trends_chart(daily_data, start_date_str, end_date_str):
+    """Create the daily quality trends line chart"""
+    # One grouping pass gives a single point per date across ticket types; rows already arrive
+    # ordered by date, so first-seen group order is chronological and the key sort can be skipped
+    daily_totals = daily_data.groupby('date', sort=False)[['good_count', 'bad_count', 'ugly_count']].sum()
+    # Smallest integer type that holds the totals, so the traces encode as compact typed arrays
+    daily_totals = daily_totals.apply(pd.to_numeric, downcast='integer')
+    dates = daily_totals.index.to_numpy()
+    
+    # Switch to WebGL rendering once SVG paths get expensive in the browser
+    use_webgl = len(dates) > WEBGL_POINT_THRESHOLD
+    
+    traces = []
+    for column, label in (('good_count', 'Good'), ('bad_count', 'Bad'), ('ugly_count', 'Ugly')):
+        x, y = downsample_minmax_lttb(dates, daily_totals[column].to_numpy(), MAX_CHART_POINTS)
+        traces.append({
+            'type': 'scattergl' if use_webgl else 'scatter',
+            'mode': 'lines',
+            'x': x,
+            'y': y,
+            'name': label,
+            'legendgroup': label,
+            'line': {'color': DAILY_TREND_COLORS[label]},
+            'showlegend': True
+        })
+    
+    fig = {
+        'data': traces,
+        'layout': {
+            'title': {'text': f"Daily Quality Trends ({start_date_str} to {end_date_str})"},
+            'xaxis': {'title': {'text': "Date"}},
+            'yaxis': {'title': {'text': "Number of Evaluations"}},
+            'legend': {'title': {'text': 'quality'}, 'tracegroupgap': 0}
+        }
+    }
+    if use_webgl:
+        fig['layout']['hovermode'] = 'x unified'
+    return fig
+
+def create_experiment_type_chart(experiment_types):
+    """Create the experiment type distribution pie chart"""
+    exp_type_counts = experiment_types.value_counts()
+    return {
+        'data': [{
+            'type': 'pie',
+            'labels': exp_type_counts.index.to_numpy(),
+            'values': exp_type_counts.to_numpy()
+        }],
+        'layout': {
+            'title': {'text': "Experiment Type Distribution"},
+            'legend': {'tracegroupgap': 0}
+        }
+    }
+
+@contextmanager
+def timed(name, timings):
+    """Record the wall time of the wrapped block in milliseconds"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
 def main():
     """Main dashboard function"""
     
+    timings = {}
+    
     # Header
     st.markdown('<h1 class="main-header">📊 LangSmith Evaluation Dashboard</h1>', unsafe_allow_html=True)
     
     # Load data
-    data = load_data()
+    with timed('load_data', timings):
+        db_mtime = get_database_mtime()
+        data = load_data(db_mtime)
     if data is None:
         st.error("Failed to load data. Please check your database connection.")
         return
@@ -90,61 +386,45 @@ def main():
     # Sidebar for filters
     st.sidebar.header("🔍 Filters")
     
-    # Date range filter
+    # Date range filter (default boundaries computed once per rerun)
     st.sidebar.subheader("Date Range")
+    today = datetime.now()
+    default_start = today - timedelta(days=30)
     date_range = st.sidebar.date_input(
         "Select date range",
-        value=(datetime.now() - timedelta(days=30), datetime.now()),
-        max_value=datetime.now()
+        value=(default_start, today),
+        max_value=today
     )
     
-    # Handle date range selection
+    # Handle date range selection; the ISO strings are bound directly as SQL parameters
     if isinstance(date_range, tuple) and len(date_range) == 2:
         start_date, end_date = date_range
-        start_date_str = start_date.strftime('%Y-%m-%d')
-        end_date_str = end_date.strftime('%Y-%m-%d')
     else:
-        start_date_str = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-        end_date_str = datetime.now().strftime('%Y-%m-%d')
+        start_date, end_date = default_start, today
+    start_date_str = start_date.strftime('%Y-%m-%d')
+    end_date_str = end_date.strftime('%Y-%m-%d')
     
     # Ticket type filter
-    ticket_types = ['All'] + sorted(data['ticket_type_distribution']['ticket_type'].unique().tolist())
-    selected_ticket_type = st.sidebar.selectbox("Ticket Type", ticket_types)
+    selected_ticket_type = st.sidebar.selectbox("Ticket Type", data['ticket_types'])
     
     # Apply filters
-    if selected_ticket_type != 'All':
-        filtered_daily = data['daily_breakdown'][data['daily_breakdown']['ticket_type'] == selected_ticket_type]
-        filtered_summary = data['evaluation_summary'][data['evaluation_summary']['ticket_type'] == selected_ticket_type]
-    else:
-        filtered_daily = data['daily_breakdown']
-        filtered_summary = data['evaluation_summary']
-    
-    # Filter by date range
-    filtered_daily = filtered_daily[
-        (filtered_daily['date'] >= start_date_str) & 
-        (filtered_daily['date'] <= end_date_str)
-    ]
+    with timed('filters', timings):
+        # The date range is applied in SQL, so any range can be shown, not just the last 30 days
+        daily_breakdown = load_daily_breakdown(start_date_str, end_date_str, db_mtime)
+        if selected_ticket_type != 'All':
+            filtered_daily = daily_breakdown[daily_breakdown['ticket_type'] == selected_ticket_type]
+        else:
+            filtered_daily = daily_breakdown
+        summary_table = data['summary_tables'].get(selected_ticket_type)
     
     # Key Metrics Row
     st.subheader("📈 Key Metrics")
     
-    col1, col2, col3, col4 = st.columns(4)
+    with timed('summary_metrics', timings):
+        metric_cards = format_summary_metrics(compute_summary_metrics(filtered_daily))
     
-    with col1:
-        total_evaluations = filtered_daily['total_evaluations'].sum()
-        st.metric("Total Evaluations", f"{total_evaluations:,}")
-    
-    with col2:
-        avg_score = filtered_daily['avg_score'].mean()
-        st.metric("Average Score", f"{avg_score:.2f}" if pd.notna(avg_score) else "N/A")
-    
-    with col3:
-        good_count = filtered_daily['good_count'].sum()
-        st.metric("Good Quality", f"{good_count:,}")
-    
-    with col4:
-        bad_ugly_count = filtered_daily['bad_count'].sum() + filtered_daily['ugly_count'].sum()
-        st.metric("Bad/Ugly Quality", f"{bad_ugly_count:,}")
+    for column, (label, value) in zip(st.columns(len(metric_cards)), metric_cards):
+        column.metric(label, value)
     
     # Charts Row 1
     st.subheader("📊 Quality Distribution Over Time")
@@ -153,66 +433,33 @@ def main():
     
     with col1:
         # Quality distribution pie chart
-        quality_data = data['quality_distribution']
-        if not quality_data.empty:
-            fig_pie = px.pie(
-                quality_data, 
-                values='count', 
-                names='quality',
-                title="Overall Quality Distribution",
-                color_discrete_map={
-                    'good': '#2E8B57',
-                    'bad': '#FF6B6B',
-                    'ugly': '#8B0000'
-                }
-            )
-            fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-            st.plotly_chart(fig_pie, use_container_width=True)
+        if data['quality_pie_chart'] is not None:
+            st.plotly_chart(data['quality_pie_chart'], use_container_width=True)
     
     with col2:
         # Ticket type distribution
-        ticket_data = data['ticket_type_distribution']
-        if not ticket_data.empty:
-            fig_bar = px.bar(
-                ticket_data,
-                x='ticket_type',
-                y='count',
-                title="Ticket Type Distribution",
-                color='ticket_type'
-            )
-            st.plotly_chart(fig_bar, use_container_width=True)
+        if data['ticket_type_chart'] is not None:
+            st.plotly_chart(data['ticket_type_chart'], use_container_width=True)
     
     # Charts Row 2
     st.subheader("📅 Daily Trends")
     
-    # Daily breakdown line chart
-    if not filtered_daily.empty:
-        # Prepare data for plotting
-        plot_data = filtered_daily.melt(
-            id_vars=['date', 'ticket_type'],
-            value_vars=['good_count', 'bad_count', 'ugly_count'],
-            var_name='quality',
-            value_name='count'
-        )
-        
-        # Clean up quality labels
-        plot_data['quality'] = plot_data['quality'].str.replace('_count', '').str.title()
-        
-        fig_line = px.line(
-            plot_data,
-            x='date',
-            y='count',
-            color='quality',
-            title=f"Daily Quality Trends ({start_date_str} to {end_date_str})",
-            color_discrete_map={
-                'Good': '#2E8B57',
-                'Bad': '#FF6B6B',
-                'Ugly': '#8B0000'
-            }
-        )
-        fig_line.update_xaxes(title_text="Date")
-        fig_line.update_yaxes(title_text="Number of Evaluations")
-        st.plotly_chart(fig_line, use_container_width=True)
+    # Daily breakdown line chart, rebuilt only when the data or the filters change
+    trends_key = (data['loaded_at'], start_date_str, end_date_str, selected_ticket_type)
+    if st.session_state.get('daily_trends_key') != trends_key:
+        st.session_state.daily_trends_chart = None
+        if not filtered_daily.empty:
+            with timed('daily_trends_chart', timings):
+                st.session_state.daily_trends_chart = create_daily_trends_chart(
+                    filtered_daily[['date', 'good_count', 'bad_count', 'ugly_count']],
+                    start_date_str,
+                    end_date_str
+                )
+        st.session_state.daily_trends_key = trends_key
+    
+    if st.session_state.daily_trends_chart is not None:
+        with timed('render_daily_trends', timings):
+            st.plotly_chart(st.session_state.daily_trends_chart, use_container_width=True)
     
     # Charts Row 3
     st.subheader("🔬 Experiment Analysis")
@@ -222,64 +469,27 @@ def main():
     with col1:
         # Latest experiments table
         st.write("**Latest Experiments**")
-        if not data['latest_experiments'].empty:
-            # Format the data for display
-            exp_display = data['latest_experiments'].copy()
-            
-            # Extract date from experiment_name instead of using database date
-            def extract_date_from_experiment_name(exp_name):
-                """Extract date from experiment name format: type-evaluation-YYYY-MM-DD-hash"""
-                try:
-                    # Look for YYYY-MM-DD pattern in the experiment name
-                    date_match = re.search(r'(\d{4}-\d{2}-\d{2})', exp_name)
-                    if date_match:
-                        return date_match.group(1)
-                    else:
-                        # Fallback to database date if no date found in name
-                        return None
-                except:
-                    return None
-            
-            # Apply date extraction to experiment names
-            exp_display['extracted_date'] = exp_display['experiment_name'].apply(extract_date_from_experiment_name)
-            
-            # Use extracted date if available, otherwise fall back to database date
-            exp_display['date'] = exp_display['extracted_date'].fillna(
-                pd.to_datetime(exp_display['date']).dt.strftime('%Y-%m-%d')
-            )
-            
-            exp_display['updated_at'] = pd.to_datetime(exp_display['updated_at']).dt.strftime('%Y-%m-%d %H:%M')
-            
+        if data['experiments_display'].num_rows > 0:
             st.dataframe(
-                exp_display[['date', 'experiment_type', 'experiment_name', 'run_count']],
+                data['experiments_display'],
                 use_container_width=True,
                 hide_index=True
             )
     
     with col2:
         # Experiment type distribution
-        if not data['latest_experiments'].empty:
-            exp_type_counts = data['latest_experiments']['experiment_type'].value_counts()
-            fig_exp = px.pie(
-                values=exp_type_counts.values,
-                names=exp_type_counts.index,
-                title="Experiment Type Distribution"
-            )
-            st.plotly_chart(fig_exp, use_container_width=True)
+        if data['experiment_type_chart'] is not None:
+            st.plotly_chart(data['experiment_type_chart'], use_container_width=True)
     
     # Data Table Section
     st.subheader("📋 Detailed Data")
     
     # Evaluation summary table
-    if not filtered_summary.empty:
+    if summary_table is not None and summary_table.num_rows > 0:
         st.write("**Evaluation Summary by Date and Ticket Type**")
         
-        # Format the data
-        summary_display = filtered_summary.copy()
-        summary_display['avg_score'] = summary_display['avg_score'].round(2)
-        
         st.dataframe(
-            summary_display,
+            summary_table,
             use_container_width=True,
             hide_index=True
         )
@@ -289,11 +499,12 @@ def main():
     
     if st.sidebar.button("Refresh Data Cache"):
         st.cache_data.clear()
+        get_api_key.clear()
         st.rerun()
     
     # API Key status
-    db = EvaluationDatabase()
-    api_key = db.get_api_key()
+    db = get_database()
+    api_key = get_api_key()
     
     if api_key:
         st.sidebar.success("✅ API Key Found")
@@ -320,6 +531,15 @@ def main():
     else:
         st.sidebar.warning("⚠️ No API Key Found")
         st.sidebar.info("Set LANGSMITH_API_KEY environment variable or create .streamlit/secrets.toml")
+    
+    # Sidebar - Profiling (enabled with ?debug=1)
+    if st.query_params.get('debug'):
+        st.sidebar.header("⏱️ Profiling")
+        st.sidebar.dataframe(
+            pd.DataFrame(list(timings.items()), columns=['step', 'ms']).round(2),
+            hide_index=True
+        )
+        st.sidebar.metric("Daily breakdown MB", f"{daily_breakdown.memory_usage(deep=True).sum() / 1e6:.3f}")
 
 if __name__ == "__main__":
     main()